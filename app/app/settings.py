@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/3.2/ref/settings/
 """
 import os
+import sys
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -26,6 +27,9 @@ DEBUG = True
 
 ALLOWED_HOSTS = ['0.0.0.0']
 
+# True when running under pytest, the only supported test runner.
+TESTING = 'pytest' in sys.modules
+
 # Application definition
 
 INSTALLED_APPS = [
@@ -86,6 +90,16 @@ DATABASES = {
     }
 }
 
+# The test suite only uses portable ORM features, so run it against an
+# in-memory SQLite database to avoid disk I/O.
+if TESTING:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': ':memory:',
+        }
+    }
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
@@ -104,6 +118,13 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Hashing passwords is the slowest part of creating test users, so use a
+# fast (insecure) hasher when running the test suite.
+if TESTING:
+    PASSWORD_HASHERS = [
+        'django.contrib.auth.hashers.MD5PasswordHasher',
+    ]
+
 # Internationalization
 # https://docs.djangoproject.com/en/3.2/topics/i18n/
 
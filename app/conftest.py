@@ -0,0 +1,46 @@
+"""
+Shared pytest configuration and fixtures.
+"""
+import logging
+
+import pytest
+
+from django.contrib.auth import get_user_model
+
+from rest_framework.test import APIClient
+
+
+def pytest_configure():
+    """Keep logging overhead out of test requests."""
+    # This silences every logger, so caplog and assertLogs will see no
+    # records; re-enable with logging.disable(logging.NOTSET) in such tests.
+    logging.disable(logging.CRITICAL)
+
+
+@pytest.fixture(scope='class')
+def api_client():
+    """Return an API client shared by the tests of a class."""
+    return APIClient()
+
+
+@pytest.fixture(scope='session')
+def user(django_db_setup, django_db_blocker):
+    """Create and return a user shared by the whole test session."""
+    with django_db_blocker.unblock():
+        user = get_user_model().objects.create_user(
+            email='session-user@example.com',
+            password='test123',
+        )
+    yield user
+    with django_db_blocker.unblock():
+        user.delete()
+
+
+@pytest.fixture
+def authed_client(api_client, user):
+    """Return an API client authenticated as the session user."""
+    # force_authenticate replaces the view's authenticators with a single
+    # ForcedAuthentication, so no token or session lookup runs per request.
+    api_client.force_authenticate(user)
+    yield api_client
+    api_client.force_authenticate(user=None)
@@ -26,25 +26,27 @@ class RecipeSerializer(serializers.ModelSerializer):
         fields = ['id', 'title', 'time_minutes', 'price', 'link', 'tags', 'ingredients']
         read_only_fields = ['id']
 
-    def _get_or_create_tags(self, tags, recipe):
+    def _get_or_create_by_name(self, model, items):
         auth_user = self.context['request'].user
+        names = [item['name'] for item in items]
 
-        for tag in tags:
-            tag_obj, created = Tag.objects.get_or_create(
-                user=auth_user,
-                **tag
-            )
-            recipe.tags.add(tag_obj)
+        objs = {
+            obj.name: obj
+            for obj in model.objects.filter(user=auth_user, name__in=names)
+        }
+        for name in names:
+            if name not in objs:
+                objs[name] = model.objects.create(user=auth_user, name=name)
 
-    def _get_or_create_ingredients(self, ingredients, recipe):
-        auth_user = self.context['request'].user
+        return list(objs.values())
 
-        for ingredient in ingredients:
-            ingredient_obj, created = Ingredient.objects.get_or_create(
-                user=auth_user,
-                **ingredient
-            )
-            recipe.ingredients.add(ingredient_obj)
+    def _get_or_create_tags(self, tags, recipe):
+        recipe.tags.add(*self._get_or_create_by_name(Tag, tags))
+
+    def _get_or_create_ingredients(self, ingredients, recipe):
+        recipe.ingredients.add(
+            *self._get_or_create_by_name(Ingredient, ingredients)
+        )
 
     def create(self, validated_data):
         tags = validated_data.pop('tags', [])
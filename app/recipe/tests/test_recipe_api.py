@@ -2,17 +2,22 @@
 Tests for recipe APIs.
 """
 from decimal import Decimal
+import functools
+import io
 import tempfile
 import os
+import shutil
+from types import MappingProxyType
+import uuid
 
+import pytest
 from PIL import Image
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase
 from django.urls import reverse
 
 from rest_framework import status
-from rest_framework.test import APIClient
+from rest_framework.test import APIRequestFactory, force_authenticate
 
 from core.models import (
     Recipe,
@@ -24,34 +29,63 @@ from recipe.serializers import (
     RecipeSerializer,
     RecipeDetailSerializer,
 )
+from recipe.views import RecipeViewSet
 
 
 RECIPES_URL = reverse('recipe:recipe-list')
 
+RECIPE_DEFAULTS = MappingProxyType({
+    'title': 'Sample recipe title',
+    'time_minutes': 22,
+    'price': Decimal('5.25'),
+    'description': 'Sample description',
+    'link': 'http://example.com/recipe.pdf',
+})
 
+
+@functools.lru_cache(maxsize=None)
 def detail_url(recipe_id):
     """Create and return a recipe detail URL."""
     return reverse('recipe:recipe-detail', args=[recipe_id])
 
 
+@functools.lru_cache(maxsize=None)
 def image_upload_url(recipe_id):
     """Create and return an image upload URL."""
     return reverse('recipe:recipe-upload-image', args=[recipe_id])
 
 
+def get_recipe_view(action, url, user=None, **kwargs):
+    """Call a RecipeViewSet GET action directly, skipping URL routing."""
+    request = APIRequestFactory().get(url)
+    if user is not None:
+        force_authenticate(request, user=user)
+    view = RecipeViewSet.as_view({'get': action})
+    return view(request, **kwargs).render()
+
+
 def create_recipe(user, **params):
     """Create and return a sample recipe."""
-    defaults = {
-        'title': 'Sample recipe title',
-        'time_minutes': 22,
-        'price': Decimal('5.25'),
-        'description': 'Sample description',
-        'link': 'http://example.com/recipe.pdf',
-    }
-    defaults.update(params)
+    defaults = {**RECIPE_DEFAULTS, **params}
+    return Recipe.objects.create(user=user, **defaults)
+
+
+def bulk_create_recipes(user, n, **params):
+    """Create and return n sample recipes in a single query."""
+    defaults = {**RECIPE_DEFAULTS, **params}
+    recipes = [Recipe(user=user, **defaults) for _ in range(n)]
+    return Recipe.objects.bulk_create(recipes)
 
-    recipe = Recipe.objects.create(user=user, **defaults)
-    return recipe
+
+def create_named(model, user, *names):
+    """Create and return model rows for user, in the order of names.
+
+    Rows are looked up by name after the insert, so names must not already
+    exist for user or an older row may be returned.
+    """
+    model.objects.bulk_create([model(user=user, name=name) for name in names])
+    objs = {o.name: o for o in model.objects.filter(user=user, name__in=names)}
+    return [objs[name] for name in names]
 
 
 def create_user(**params):
@@ -59,100 +93,111 @@ def create_user(**params):
     return get_user_model().objects.create_user(**params)
 
 
-class PublicRecipeAPITests(TestCase):
+@pytest.mark.django_db
+class PublicRecipeAPITests:
     """Test unauthenticated API requests."""
 
-    def setUp(self):
-        self.client = APIClient()
-
     def test_auth_required(self):
         """Test auth is required to call API."""
-        res = self.client.get(RECIPES_URL)
+        res = get_recipe_view('list', RECIPES_URL)
 
-        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        assert res.status_code == status.HTTP_401_UNAUTHORIZED
 
 
-class PrivateRecipeApiTests(TestCase):
+@pytest.mark.django_db
+class PrivateRecipeApiTests:
     """Test authenticated API requests."""
 
-    def setUp(self):
-        self.client = APIClient()
-        self.user = create_user(email='user@example.com', password='test123')
-        self.client.force_authenticate(self.user)
-
-    def test_retrieve_recipes(self):
+    def test_retrieve_recipes(self, user, django_assert_num_queries):
         """Test retrieving a list of recipes."""
-        create_recipe(user=self.user)
-        create_recipe(user=self.user)
+        bulk_create_recipes(user, 2)
 
-        res = self.client.get(RECIPES_URL)
+        # Recipes, then one prefetch each for tags and ingredients.
+        with django_assert_num_queries(3):
+            res = get_recipe_view('list', RECIPES_URL, user)
 
-        recipes = Recipe.objects.all().order_by('-id')
-        serializer = RecipeSerializer(recipes, many=True)
-        self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        recipe_ids = Recipe.objects.order_by(
+            '-id',
+        ).values_list('id', flat=True)
+        assert res.status_code == status.HTTP_200_OK
+        assert [r['id'] for r in res.data] == list(recipe_ids)
 
-    def test_recipe_list_limited_to_user(self):
+    def test_recipe_list_limited_to_user(
+        self, user, django_assert_num_queries,
+    ):
         """Test list of recipes is limited to authenticated user."""
-        other_user = create_user(email='other@example.com', password='test123')
-        create_recipe(user=other_user)
-        create_recipe(user=self.user)
-
-        res = self.client.get(RECIPES_URL)
-
-        recipes = Recipe.objects.filter(user=self.user)
-        serializer = RecipeSerializer(recipes, many=True)
-        self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
-
-    def test_get_recipe_detail(self):
+        other_user = create_user(
+            email=f'{uuid.uuid4().hex}@example.com',
+            password='test123',
+        )
+        bulk_create_recipes(other_user, 1)
+        bulk_create_recipes(user, 1)
+
+        with django_assert_num_queries(3):
+            res = get_recipe_view('list', RECIPES_URL, user)
+
+        recipe_ids = Recipe.objects.filter(
+            user=user,
+        ).order_by('-id').values_list('id', flat=True)
+        assert res.status_code == status.HTTP_200_OK
+        assert [r['id'] for r in res.data] == list(recipe_ids)
+
+    @pytest.mark.parametrize('num_related', [0, 2, 5])
+    def test_get_recipe_detail(
+        self, user, django_assert_num_queries, num_related,
+    ):
         """Test get recipe detail."""
-        recipe = create_recipe(user=self.user)
+        recipe = create_recipe(user=user)
+        names = [f'Item {i}' for i in range(num_related)]
+        recipe.tags.add(*create_named(Tag, user, *names))
+        recipe.ingredients.add(*create_named(Ingredient, user, *names))
 
         url = detail_url(recipe.id)
-        res = self.client.get(url)
+        # Constant regardless of how many tags and ingredients are attached.
+        with django_assert_num_queries(3):
+            res = get_recipe_view('retrieve', url, user, pk=recipe.id)
 
         serializer = RecipeDetailSerializer(recipe)
-        self.assertEqual(res.data, serializer.data)
+        assert res.data == serializer.data
 
-    def test_create_recipe(self):
+    def test_create_recipe(self, authed_client, user):
         """Test creating a recipe."""
         payload = {
             'title': 'Sample recipe',
             'time_minutes': 30,
             'price': Decimal('5.99'),
         }
-        res = self.client.post(RECIPES_URL, payload)
+        res = authed_client.post(RECIPES_URL, payload)
 
-        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        assert res.status_code == status.HTTP_201_CREATED
         recipe = Recipe.objects.get(id=res.data['id'])
         for k, v in payload.items():
-            self.assertEqual(getattr(recipe, k), v)
-        self.assertEqual(recipe.user, self.user)
+            assert getattr(recipe, k) == v
+        assert recipe.user == user
 
-    def test_partial_update(self):
+    def test_partial_update(self, authed_client, user):
         """Test partial update of a recipe."""
         original_link = 'https://example.com/recipe.pdf'
         recipe = create_recipe(
-            user=self.user,
+            user=user,
             title='Sample recipe title',
             link=original_link,
         )
 
         payload = {'title': 'New recipe title'}
         url = detail_url(recipe.id)
-        res = self.client.patch(url, payload)
+        res = authed_client.patch(url, payload)
 
-        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        assert res.status_code == status.HTTP_200_OK
         recipe.refresh_from_db()
-        self.assertEqual(recipe.title, payload['title'])
-        self.assertEqual(recipe.link, original_link)
-        self.assertEqual(recipe.user, self.user)
+        assert recipe.title == payload['title']
+        assert recipe.link == original_link
+        assert recipe.user == user
 
-    def test_full_update(self):
+    def test_full_update(self, authed_client, user):
         """Test full update of recipe."""
         recipe = create_recipe(
-            user=self.user,
+            user=user,
             title='Sample recipe title',
             link='https://exmaple.com/recipe.pdf',
             description='Sample recipe description.',
@@ -166,294 +211,290 @@ class PrivateRecipeApiTests(TestCase):
             'price': Decimal('2.50'),
         }
         url = detail_url(recipe.id)
-        res = self.client.put(url, payload)
+        res = authed_client.put(url, payload)
 
-        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        assert res.status_code == status.HTTP_200_OK
         recipe.refresh_from_db()
         for k, v in payload.items():
-            self.assertEqual(getattr(recipe, k), v)
-        self.assertEqual(recipe.user, self.user)
+            assert getattr(recipe, k) == v
+        assert recipe.user == user
 
-    def test_update_user_returns_error(self):
+    def test_update_user_returns_error(self, authed_client, user):
         """Test changing the recipe user results in an error."""
-        new_user = create_user(email='user2@example.com', password='test123')
-        recipe = create_recipe(user=self.user)
+        new_user = create_user(
+            email=f'{uuid.uuid4().hex}@example.com',
+            password='test123',
+        )
+        recipe = create_recipe(user=user)
 
         payload = {'user': new_user.id}
         url = detail_url(recipe.id)
-        self.client.patch(url, payload)
+        authed_client.patch(url, payload)
 
         recipe.refresh_from_db()
-        self.assertEqual(recipe.user, self.user)
+        assert recipe.user == user
 
-    def test_delete_recipe(self):
+    def test_delete_recipe(
+        self, authed_client, user, django_assert_num_queries,
+    ):
         """Test deleting a recipe successful."""
-        recipe = create_recipe(user=self.user)
+        recipe_pk = create_recipe(user=user).pk
 
-        url = detail_url(recipe.id)
-        res = self.client.delete(url)
+        url = detail_url(recipe_pk)
+        # Fetch the recipe, then delete its tag and ingredient links and row;
+        # nothing is prefetched for serialization.
+        with django_assert_num_queries(4):
+            res = authed_client.delete(url)
 
-        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
-        self.assertFalse(Recipe.objects.filter(id=recipe.id).exists())
+        assert res.status_code == status.HTTP_204_NO_CONTENT
+        assert not Recipe.objects.filter(pk=recipe_pk).exists()
 
-    def test_recipe_other_users_recipe_error(self):
+    def test_recipe_other_users_recipe_error(self, authed_client):
         """Test trying to delete another users recipe gives error."""
-        new_user = create_user(email='user2@example.com', password='test123')
-        recipe = create_recipe(user=new_user)
-
-        url = detail_url(recipe.id)
-        res = self.client.delete(url)
-
-        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
-        self.assertTrue(Recipe.objects.filter(id=recipe.id).exists())
-
-    def test_create_recipe_with_new_tags(self):
-        """Test creating a recipe with new tags."""
-        payload = {
-            'title': 'Thai Prawn Curry',
-            'time_minutes': 30,
-            'price': Decimal('2.50'),
-            'tags': [{'name': 'Thai'}, {'name': 'Dinner'}],
-        }
-        res = self.client.post(RECIPES_URL, payload, format='json')
-
-        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
-        recipes = Recipe.objects.filter(user=self.user)
-        self.assertEqual(recipes.count(), 1)
-        recipe = recipes[0]
-        self.assertEqual(recipe.tags.count(), 2)
-        for tag in payload['tags']:
-            exists = recipe.tags.filter(
-                name=tag['name'],
-                user=self.user,
-            ).exists()
-            self.assertTrue(exists)
-
-    def test_create_recipe_with_existing_tags(self):
-        """Test creating a recipe with existing tag."""
-        tag_indian = Tag.objects.create(user=self.user, name='Indian')
-        payload = {
-            'title': 'Pongal',
-            'time_minutes': 60,
-            'price': Decimal('4.50'),
-            'tags': [{'name': 'Indian'}, {'name': 'Breakfast'}],
-        }
-        res = self.client.post(RECIPES_URL, payload, format='json')
-
-        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
-        recipes = Recipe.objects.filter(user=self.user)
-        self.assertEqual(recipes.count(), 1)
-        recipe = recipes[0]
-        self.assertEqual(recipe.tags.count(), 2)
-        self.assertIn(tag_indian, recipe.tags.all())
-        for tag in payload['tags']:
-            exists = recipe.tags.filter(
-                name=tag['name'],
-                user=self.user,
-            ).exists()
-            self.assertTrue(exists)
-
-    def test_create_tag_on_update(self):
+        new_user = create_user(
+            email=f'{uuid.uuid4().hex}@example.com',
+            password='test123',
+        )
+        recipe_pk = create_recipe(user=new_user).pk
+
+        url = detail_url(recipe_pk)
+        res = authed_client.delete(url)
+
+        assert res.status_code == status.HTTP_404_NOT_FOUND
+        assert Recipe.objects.filter(pk=recipe_pk).exists()
+
+    @pytest.mark.parametrize(
+        'field, model, recipe, names, existing',
+        [
+            pytest.param(
+                'tags', Tag,
+                {
+                    'title': 'Thai Prawn Curry',
+                    'time_minutes': 30,
+                    'price': Decimal('2.50'),
+                },
+                ['Thai', 'Dinner'], None,
+                id='new-tags',
+            ),
+            pytest.param(
+                'tags', Tag,
+                {
+                    'title': 'Pongal',
+                    'time_minutes': 60,
+                    'price': Decimal('4.50'),
+                },
+                ['Indian', 'Breakfast'], 'Indian',
+                id='existing-tags',
+            ),
+            pytest.param(
+                'ingredients', Ingredient,
+                {
+                    'title': 'Cauliflower Tacos',
+                    'time_minutes': 60,
+                    'price': Decimal('4.30'),
+                },
+                ['Cauliflower', 'Salt'], None,
+                id='new-ingredients',
+            ),
+            pytest.param(
+                'ingredients', Ingredient,
+                {
+                    'title': 'Vietnamese Soup',
+                    'time_minutes': 25,
+                    'price': '2.55',
+                },
+                ['Lemon', 'Fish Sauce'], 'Lemon',
+                id='existing-ingredients-string-price',
+            ),
+        ],
+    )
+    def test_create_recipe_with_related(
+        self, authed_client, user, django_assert_num_queries,
+        field, model, recipe, names, existing,
+    ):
+        """Test creating a recipe with new or existing tags/ingredients."""
+        if existing:
+            existing_obj = model.objects.create(user=user, name=existing)
+        payload = {**recipe, field: [{'name': name} for name in names]}
+        # Insert recipe, one lookup for all names, insert each missing one,
+        # link them, then serialize tags and ingredients.
+        with django_assert_num_queries(6 if existing else 7):
+            res = authed_client.post(RECIPES_URL, payload, format='json')
+
+        assert res.status_code == status.HTTP_201_CREATED
+        recipes = Recipe.objects.filter(user=user)
+        assert recipes.count() == 1
+        assert recipes[0].title == recipe['title']
+        assert recipes[0].time_minutes == recipe['time_minutes']
+        assert recipes[0].price == Decimal(recipe['price'])
+        related = getattr(recipes[0], field)
+        assert related.count() == 2
+        if existing:
+            assert existing_obj in related.all()
+        found = related.filter(
+            user=user,
+            name__in=names,
+        ).values_list('name', flat=True)
+        assert set(found) == set(names)
+
+    def test_create_tag_on_update(self, authed_client, user):
         """Test create tag when updating a recipe."""
-        recipe = create_recipe(user=self.user)
+        recipe = create_recipe(user=user)
 
         payload = {'tags': [{'name': 'Lunch'}]}
         url = detail_url(recipe.id)
-        res = self.client.patch(url, payload, format='json')
+        res = authed_client.patch(url, payload, format='json')
 
-        self.assertEqual(res.status_code, status.HTTP_200_OK)
-        new_tag = Tag.objects.get(user=self.user, name='Lunch')
-        self.assertIn(new_tag, recipe.tags.all())
+        assert res.status_code == status.HTTP_200_OK
+        new_tag = Tag.objects.get(user=user, name='Lunch')
+        assert new_tag in recipe.tags.all()
 
-    def test_update_recipe_assign_tag(self):
+    def test_update_recipe_assign_tag(self, authed_client, user):
         """Test assigning an existing tag when updating a recipe."""
-        tag_breakfast = Tag.objects.create(user=self.user, name='Breakfast')
-        recipe = create_recipe(user=self.user)
+        tag_breakfast, tag_lunch = create_named(
+            Tag, user, 'Breakfast', 'Lunch',
+        )
+        recipe = create_recipe(user=user)
         recipe.tags.add(tag_breakfast)
 
-        tag_lunch = Tag.objects.create(user=self.user, name='Lunch')
         payload = {'tags': [{'name': 'Lunch'}]}
         url = detail_url(recipe.id)
-        res = self.client.patch(url, payload, format='json')
+        res = authed_client.patch(url, payload, format='json')
 
-        self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertIn(tag_lunch, recipe.tags.all())
-        self.assertNotIn(tag_breakfast, recipe.tags.all())
+        assert res.status_code == status.HTTP_200_OK
+        assert tag_lunch in recipe.tags.all()
+        assert tag_breakfast not in recipe.tags.all()
 
-    def test_clear_recipe_tags(self):
+    def test_clear_recipe_tags(self, authed_client, user):
         """Test clearing a recipes tags."""
-        tag = Tag.objects.create(user=self.user, name='Dessert')
-        recipe = create_recipe(user=self.user)
+        [tag] = create_named(Tag, user, 'Dessert')
+        recipe = create_recipe(user=user)
         recipe.tags.add(tag)
 
         payload = {'tags': []}
         url = detail_url(recipe.id)
-        res = self.client.patch(url, payload, format='json')
+        res = authed_client.patch(url, payload, format='json')
 
-        self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(recipe.tags.count(), 0)
+        assert res.status_code == status.HTTP_200_OK
+        assert recipe.tags.count() == 0
 
-    def test_create_recipe_with_new_ingredients(self):
-        """Test creating a recipe with new ingredients."""
-        payload = {
-            'title': 'Cauliflower Tacos',
-            'time_minutes': 60,
-            'price': Decimal('4.30'),
-            'ingredients': [{'name': 'Cauliflower'}, {'name': 'Salt'}],
-        }
-        res = self.client.post(RECIPES_URL, payload, format='json')
-
-        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
-        recipes = Recipe.objects.filter(user=self.user)
-        self.assertEqual(recipes.count(), 1)
-        recipe = recipes[0]
-        self.assertEqual(recipe.ingredients.count(), 2)
-        for ingredient in payload['ingredients']:
-            exists = recipe.ingredients.filter(
-                name=ingredient['name'],
-                user=self.user,
-            ).exists()
-            self.assertTrue(exists)
-
-    def test_create_recipe_with_existing_ingredient(self):
-        """Test creating a new recipe with existing ingredient."""
-        ingredient = Ingredient.objects.create(user=self.user, name='Lemon')
-        payload = {
-            'title': 'Vietnamese Soup',
-            'time_minutes': 25,
-            'price': '2.55',
-            'ingredients': [{'name': 'Lemon'}, {'name': 'Fish Sauce'}],
-        }
-        res = self.client.post(RECIPES_URL, payload, format='json')
-
-        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
-        recipes = Recipe.objects.filter(user=self.user)
-        self.assertEqual(recipes.count(), 1)
-        recipe = recipes[0]
-        self.assertEqual(recipe.ingredients.count(), 2)
-        self.assertIn(ingredient, recipe.ingredients.all())
-        for ingredient in payload['ingredients']:
-            exists = recipe.ingredients.filter(
-                name=ingredient['name'],
-                user=self.user,
-            ).exists()
-            self.assertTrue(exists)
-
-    def test_create_ingredient_on_update(self):
+    def test_create_ingredient_on_update(self, authed_client, user):
         """Test creating an ingredient when updating a recipe."""
-        recipe = create_recipe(user=self.user)
+        recipe = create_recipe(user=user)
 
         payload = {'ingredients': [{'name': 'Limes'}]}
         url = detail_url(recipe.id)
-        res = self.client.patch(url, payload, format='json')
+        res = authed_client.patch(url, payload, format='json')
 
-        self.assertEqual(res.status_code, status.HTTP_200_OK)
-        new_ingredient = Ingredient.objects.get(user=self.user, name='Limes')
-        self.assertIn(new_ingredient, recipe.ingredients.all())
+        assert res.status_code == status.HTTP_200_OK
+        new_ingredient = Ingredient.objects.get(user=user, name='Limes')
+        assert new_ingredient in recipe.ingredients.all()
 
-    def test_update_recipe_assign_ingredient(self):
+    def test_update_recipe_assign_ingredient(self, authed_client, user):
         """Test assigning an existing ingredient when updating a recipe."""
-        ingredient1 = Ingredient.objects.create(user=self.user, name='Pepper')
-        recipe = create_recipe(user=self.user)
+        ingredient1, ingredient2 = create_named(
+            Ingredient, user, 'Pepper', 'Chili',
+        )
+        recipe = create_recipe(user=user)
         recipe.ingredients.add(ingredient1)
 
-        ingredient2 = Ingredient.objects.create(user=self.user, name='Chili')
         payload = {'ingredients': [{'name': 'Chili'}]}
         url = detail_url(recipe.id)
-        res = self.client.patch(url, payload, format='json')
+        res = authed_client.patch(url, payload, format='json')
 
-        self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertIn(ingredient2, recipe.ingredients.all())
-        self.assertNotIn(ingredient1, recipe.ingredients.all())
+        assert res.status_code == status.HTTP_200_OK
+        assert ingredient2 in recipe.ingredients.all()
+        assert ingredient1 not in recipe.ingredients.all()
 
-    def test_clear_recipe_ingredients(self):
+    def test_clear_recipe_ingredients(self, authed_client, user):
         """Test clearing a recipes ingredients."""
-        ingredient = Ingredient.objects.create(user=self.user, name='Garlic')
-        recipe = create_recipe(user=self.user)
+        [ingredient] = create_named(Ingredient, user, 'Garlic')
+        recipe = create_recipe(user=user)
         recipe.ingredients.add(ingredient)
 
         payload = {'ingredients': []}
         url = detail_url(recipe.id)
-        res = self.client.patch(url, payload, format='json')
+        res = authed_client.patch(url, payload, format='json')
 
-        self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(recipe.ingredients.count(), 0)
+        assert res.status_code == status.HTTP_200_OK
+        assert recipe.ingredients.count() == 0
 
-    def test_filter_by_tags(self):
+    def test_filter_by_tags(self, authed_client, user):
         """Test filtering recipes by tags."""
-        r1 = create_recipe(user=self.user, title='Thai Vegetable Curry')
-        r2 = create_recipe(user=self.user, title='Aubergine with Tahini')
-        tag1 = Tag.objects.create(user=self.user, name='Vegan')
-        tag2 = Tag.objects.create(user=self.user, name='Vegetarian')
+        r1 = create_recipe(user=user, title='Thai Vegetable Curry')
+        r2 = create_recipe(user=user, title='Aubergine with Tahini')
+        tag1, tag2 = create_named(Tag, user, 'Vegan', 'Vegetarian')
         r1.tags.add(tag1)
         r2.tags.add(tag2)
-        r3 = create_recipe(user=self.user, title='Fish and chips')
+        r3 = create_recipe(user=user, title='Fish and chips')
 
         params = {'tags': f'{tag1.id},{tag2.id}'}
-        res = self.client.get(RECIPES_URL, params)
+        res = authed_client.get(RECIPES_URL, params)
 
         s1 = RecipeSerializer(r1)
         s2 = RecipeSerializer(r2)
         s3 = RecipeSerializer(r3)
-        self.assertIn(s1.data, res.data)
-        self.assertIn(s2.data, res.data)
-        self.assertNotIn(s3.data, res.data)
+        assert s1.data in res.data
+        assert s2.data in res.data
+        assert s3.data not in res.data
 
-    def test_filter_by_ingredients(self):
+    def test_filter_by_ingredients(self, authed_client, user):
         """Test filtering recipes by ingredients."""
-        r1 = create_recipe(user=self.user, title='Posh Beans on Toast')
-        r2 = create_recipe(user=self.user, title='Chicken Cacciatore')
-        in1 = Ingredient.objects.create(user=self.user, name='Feta Cheese')
-        in2 = Ingredient.objects.create(user=self.user, name='Chicken')
+        r1 = create_recipe(user=user, title='Posh Beans on Toast')
+        r2 = create_recipe(user=user, title='Chicken Cacciatore')
+        in1, in2 = create_named(Ingredient, user, 'Feta Cheese', 'Chicken')
         r1.ingredients.add(in1)
         r2.ingredients.add(in2)
-        r3 = create_recipe(user=self.user, title='Red Lentil Daal')
+        r3 = create_recipe(user=user, title='Red Lentil Daal')
 
         params = {'ingredients': f'{in1.id},{in2.id}'}
-        res = self.client.get(RECIPES_URL, params)
+        res = authed_client.get(RECIPES_URL, params)
 
         s1 = RecipeSerializer(r1)
         s2 = RecipeSerializer(r2)
         s3 = RecipeSerializer(r3)
-        self.assertIn(s1.data, res.data)
-        self.assertIn(s2.data, res.data)
-        self.assertNotIn(s3.data, res.data)
+        assert s1.data in res.data
+        assert s2.data in res.data
+        assert s3.data not in res.data
 
 
-class ImageUploadTests(TestCase):
+@pytest.mark.django_db
+class ImageUploadTests:
     """Tests for the image upload API."""
 
-    def setUp(self):
-        self.client = APIClient()
-        self.user = get_user_model().objects.create_user(
-            'user@example.com',
-            'password123',
-        )
-        self.client.force_authenticate(self.user)
-        self.recipe = create_recipe(user=self.user)
+    @pytest.fixture(autouse=True)
+    def media_root(self, settings):
+        """Store uploaded images in a temporary directory."""
+        settings.MEDIA_ROOT = tempfile.mkdtemp()
+        yield settings.MEDIA_ROOT
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+
+    @pytest.fixture
+    def recipe(self, user):
+        """Create a recipe and remove its image afterwards."""
+        recipe = create_recipe(user=user)
+        yield recipe
+        recipe.image.delete()
+
+    def test_upload_image(self, authed_client, recipe):
+        """Test uploading an image to a recipe."""
+        url = image_upload_url(recipe.id)
+        image_file = io.BytesIO()
+        Image.new('RGB', (1, 1)).save(image_file, format='JPEG')
+        image_file.seek(0)
+        image_file.name = 'test.jpg'
+        payload = {'image': image_file}
+        res = authed_client.post(url, payload, format='multipart')
 
-    def tearDown(self):
-        self.recipe.image.delete()
+        recipe.refresh_from_db()
+        assert res.status_code == status.HTTP_200_OK
+        assert 'image' in res.data
+        assert os.path.exists(recipe.image.path)
 
-    def test_upload_image(self):
-        """Test uploading an image to a recipe."""
-        url = image_upload_url(self.recipe.id)
-        with tempfile.NamedTemporaryFile(suffix='.jpg') as image_file:
-            img = Image.new('RGB', (10, 10))
-            img.save(image_file, format='JPEG')
-            image_file.seek(0)
-            payload = {'image': image_file}
-            res = self.client.post(url, payload, format='multipart')
-
-        self.recipe.refresh_from_db()
-        self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertIn('image', res.data)
-        self.assertTrue(os.path.exists(self.recipe.image.path))
-
-    def test_upload_image_bad_request(self):
+    def test_upload_image_bad_request(self, authed_client, recipe):
         """Test uploading an invalid image."""
-        url = image_upload_url(self.recipe.id)
+        url = image_upload_url(recipe.id)
         payload = {'image': 'notanimage'}
-        res = self.client.post(url, payload, format='multipart')
+        res = authed_client.post(url, payload, format='multipart')
 
-        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+        assert res.status_code == status.HTTP_400_BAD_REQUEST